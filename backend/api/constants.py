@@ -1,6 +1,10 @@
 DEFAULT_PAGE_SIZE = 6
 MAX_PAGE_SIZE = 100
 
+IMAGE_BASE64_MAX_LENGTH = 14 * 1024 * 1024
+
+SHOPPING_CART_PDF_CACHE_TIMEOUT = 60 * 60
+
 INGREDIENT_NAME_MAX_LENGTH = 255
 MEASUREMENT_UNIT_MAX_LENGTH = 50
 
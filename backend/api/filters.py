@@ -2,6 +2,8 @@ from django_filters import rest_framework as filters
 
 from recipes.models import Recipe, Ingredient
 
+from .mixins import annotate_recipe_flags
+
 
 class RecipeFilter(filters.FilterSet):
     tags = filters.CharFilter(method='filter_tags', label='Filter by tags')
@@ -20,21 +22,18 @@ class RecipeFilter(filters.FilterSet):
             queryset = queryset.filter(tags__slug__in=tag_slugs)
         return queryset
 
+    def filter_flag(self, queryset, name, value):
+        # Флаги аннотирует RecipeViewSet.get_queryset; для действий
+        # с голым queryset рецептов они добавляются здесь.
+        if name not in queryset.query.annotations:
+            queryset = annotate_recipe_flags(queryset, self.request.user)
+        return queryset.filter(**{name: value})
+
     def filter_is_favorited(self, queryset, name, value):
-        user = self.request.user
-        if not user.is_authenticated:
-            return queryset.none() if value else queryset
-        return (queryset.filter(favorited_by__user=user)
-                if value else queryset.exclude(favorited_by__user=user))
+        return self.filter_flag(queryset, name, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if not user.is_authenticated:
-            return queryset.none() if value else queryset
-        if value:
-            return queryset.filter(in_carts__user=user)
-        else:
-            return queryset.exclude(in_carts__user=user)
+        return self.filter_flag(queryset, name, value)
 
 
 class IngredientFilter(filters.FilterSet):
@@ -45,4 +44,4 @@ class IngredientFilter(filters.FilterSet):
         fields = ['name']
 
     def filter_name(self, queryset, name, value):
-        return queryset.filter(name__icontains=value)
+        return queryset.filter(name__istartswith=value)
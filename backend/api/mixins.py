@@ -1,6 +1,169 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    BooleanField, Count, Exists, Max, OuterRef, Prefetch, Value
+)
+from django.http import HttpResponseNotModified
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from recipes.models import (
+    Favorite, Recipe, RecipeIngredient, ShoppingCart, Tag
+)
+from users.models import Subscription, User
+
+from .constants import MAX_PAGE_SIZE
+
+# Колонки пользователя, которые читает UserSerializer; пароль, даты и
+# флаги прав в списках не выбираются.
+USER_FIELDS = ('id', 'email', 'first_name', 'last_name', 'avatar')
+
+
+def annotate_is_subscribed(queryset, user):
+    """
+    Добавляет к queryset пользователей флаг is_subscribed,
+    вычисленный в SQL через EXISTS для текущего пользователя.
+    """
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscription.objects.filter(
+                follower=user, following=OuterRef('pk')
+            )
+        )
+    )
+
+
+def get_recipe_queryset(user):
+    """
+    Queryset рецептов с подгруженными автором, тегами и ингредиентами
+    и флагами is_favorited и is_in_shopping_cart, вычисленными в SQL
+    через EXISTS для текущего пользователя.
+    """
+    queryset = Recipe.objects.prefetch_related(
+        Prefetch(
+            'author',
+            queryset=annotate_is_subscribed(
+                User.objects.only(*USER_FIELDS), user
+            )
+        ),
+        Prefetch('tags', queryset=Tag.objects.only('id', 'name', 'slug')),
+        Prefetch(
+            'ingredient_links',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient'
+            ).only(
+                'id', 'amount', 'recipe_id', 'ingredient_id',
+                'ingredient__name', 'ingredient__measurement_unit'
+            )
+        ),
+    )
+    return annotate_recipe_flags(queryset, user)
+
+
+def annotate_recipe_flags(queryset, user):
+    """
+    Добавляет к queryset рецептов флаги is_favorited и
+    is_in_shopping_cart, вычисленные в SQL через EXISTS
+    для текущего пользователя.
+    """
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField()),
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+def get_subscription_queryset(queryset, request):
+    """
+    Дополняет queryset авторов данными для списка подписок: флагом
+    подписки, числом рецептов и не более recipes_limit последними
+    рецептами каждого автора (только поля краткого представления),
+    подгруженными одним запросом. recipes_limit разбирается один раз
+    и ограничивается сверху MAX_PAGE_SIZE.
+    """
+    try:
+        limit = int(request.query_params.get('recipes_limit') or 0)
+    except (ValueError, TypeError):
+        raise ValidationError(
+            {'recipes_limit': 'Ожидается целое число.'}
+        )
+    limit = min(limit, MAX_PAGE_SIZE)
+    recipes = Recipe.objects.only(
+        'id', 'name', 'image', 'cooking_time', 'author_id'
+    ).order_by('-id')
+    if limit > 0:
+        recipes = recipes[:limit]
+    return annotate_is_subscribed(
+        queryset.only(*USER_FIELDS), request.user
+    ).annotate(
+        recipes_count=Count('recipes')
+    ).prefetch_related(
+        Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+    )
+
+
+def list_version_key(model):
+    """Ключ кэша, под которым хранится версия данных справочника."""
+    return f'{model._meta.label_lower}:list-version'
+
+
+class CachedListMixin:
+    """
+    Миксин, кэширующий сериализованный ответ списка справочных данных
+    (теги, ингредиенты) и отдающий ETag. Версия данных хранится в кэше
+    и сбрасывается сигналами при изменении записей.
+    """
+    cache_timeout = 60 * 60
+    version_timeout = 5 * 60
+
+    def get_list_version(self):
+        queryset = self.get_queryset()
+
+        def compute_version():
+            version = queryset.aggregate(
+                updated=Max('updated_at'), count=Count('id')
+            )
+            updated = version['updated']
+            updated = updated.timestamp() if updated else 0
+            return f'{updated}:{version["count"]}'
+
+        return cache.get_or_set(
+            list_version_key(queryset.model),
+            compute_version,
+            self.version_timeout
+        )
+
+    def list(self, request, *args, **kwargs):
+        version = self.get_list_version()
+        params = request.query_params.urlencode()
+        etag = '"{}"'.format(
+            hashlib.md5(f'{version}:{params}'.encode()).hexdigest()
+        )
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponseNotModified(headers={'ETag': etag})
+
+        key = f'{self.basename}:list:{version}:{params}'
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, self.cache_timeout)
+        return Response(data, headers={'ETag': etag})
+
 
 class RelationHandlerMixin:
     """
@@ -12,13 +175,22 @@ class RelationHandlerMixin:
         relation_qs = model.objects.filter(user=request.user, recipe=recipe)
 
         if request.method == 'POST':
-            data = {'user': request.user.id, 'recipe': recipe.id}
+            # Одна вставка без предварительных SELECT: повторное
+            # добавление отсекает уникальное ограничение в БД.
+            try:
+                with transaction.atomic():
+                    relation = model.objects.create(
+                        user=request.user, recipe=recipe
+                    )
+            except IntegrityError:
+                return Response(
+                    {'error': f'Уже добавлено в {relation_name}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             serializer = serializer_class(
-                data=data,
+                relation,
                 context={'request': request}
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED
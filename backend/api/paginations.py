@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from .constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
@@ -8,3 +8,37 @@ class SubscriptionPagination(PageNumberPagination):
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = 'limit'
     max_page_size = MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация рецептов по id: без COUNT и OFFSET."""
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    ordering = '-id'
+
+
+class RecipePagination(PageNumberPagination):
+    """
+    Пагинация списка рецептов. По умолчанию постраничная (page, limit,
+    count), как ожидает фронтенд; при наличии параметра cursor
+    (в том числе пустого для первой страницы) — курсорная.
+    """
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_param = RecipeCursorPagination.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,17 +1,20 @@
-import base64
+import copy
 import uuid
 
 from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
+import pybase64
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
 from recipes.models import (
     Ingredient, Tag, Recipe, RecipeIngredient,
     Favorite, ShoppingCart
 )
-from users.models import Subscription
+
+from .constants import IMAGE_BASE64_MAX_LENGTH
+from .mixins import get_recipe_queryset
 
 
 User = get_user_model()
@@ -21,16 +24,48 @@ class Base64ImageField(serializers.ImageField):
     """Поле для обработки изображений в формате base64 с уникальным именем."""
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            header, imgstr = data.split(';base64,')
+            header, _, imgstr = data.partition(';base64,')
+            if len(imgstr) > IMAGE_BASE64_MAX_LENGTH:
+                raise serializers.ValidationError(
+                    'Изображение слишком большое.'
+                )
+            try:
+                decoded = pybase64.b64decode(imgstr)
+            except ValueError:
+                raise serializers.ValidationError(
+                    'Некорректные данные изображения.'
+                )
             ext = header.split('/')[-1]
             filename = f'{uuid.uuid4().hex[:10]}.{ext}'
-            data = ContentFile(
-                base64.b64decode(imgstr),
-                name=filename
-            )
+            data = ContentFile(decoded, name=filename)
         return super().to_internal_value(data)
 
 
+class CachedFieldsMixin:
+    """
+    Миксин, кэширующий набор полей сериализатора на уровне класса,
+    чтобы интроспекция модели не повторялась при каждом создании
+    сериализатора. Экземпляр получает копии закэшированных полей.
+    """
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        if cls not in self._fields_cache:
+            self._fields_cache[cls] = super().get_fields()
+        return {
+            name: (
+                copy.deepcopy(field)
+                if isinstance(field, (
+                    serializers.BaseSerializer,
+                    serializers.ManyRelatedField
+                ))
+                else copy.copy(field)
+            )
+            for name, field in self._fields_cache[cls].items()
+        }
+
+
 class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для загрузки и удаления аватара пользователя."""
     avatar = Base64ImageField(required=False)
@@ -103,9 +138,9 @@ class PasswordChangeSerializer(serializers.Serializer):
         return attrs
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Сериализатор пользователя с флагом подписки."""
-    is_subscribed = serializers.SerializerMethodField()
+    is_subscribed = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         model = User
@@ -114,74 +149,24 @@ class UserSerializer(serializers.ModelSerializer):
             'last_name', 'avatar', 'is_subscribed'
         )
 
-    def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return bool(
-            user
-            and user.is_authenticated
-            and Subscription.objects.filter(
-                follower=user,
-                following=obj
-            ).exists()
-        )
-
-
-class SubscriptionListSerializer(serializers.ModelSerializer):
-    """Сериализатор списка подписок пользователя."""
-    recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(read_only=True)
-    is_subscribed = serializers.SerializerMethodField()
-
-    class Meta:
-        model = User
-        fields = (
-            'id', 'email', 'first_name',
-            'last_name', 'avatar', 'is_subscribed',
-            'recipes', 'recipes_count'
-        )
-
-    def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return bool(
-            user
-            and user.is_authenticated
-            and Subscription.objects.filter(
-                follower=user,
-                following=obj
-            ).exists()
-        )
-
-    def get_recipes(self, obj):
-        from api.serializers import RecipeSerializer
-        params = self.context['request'].query_params
-        try:
-            limit = int(params.get('recipes_limit', 0))
-        except (ValueError, TypeError):
-            limit = None
-        qs = obj.recipes.all()
-        if limit:
-            qs = qs[:limit]
-        return RecipeSerializer(
-            qs, many=True,
-            context=self.context
-        ).data
-
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиента."""
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        fields = ('id', 'name', 'measurement_unit')
 
 
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор тега."""
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'slug')
 
 
-class RecipeIngredientSerializer(serializers.ModelSerializer):
+class RecipeIngredientSerializer(
+    CachedFieldsMixin, serializers.ModelSerializer
+):
     """Сериализатор связи ингредиента и рецепта."""
     id = serializers.IntegerField(
         source='ingredient.id'
@@ -209,7 +194,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         return value
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """Сериализатор рецепта (чтение)."""
     author = UserSerializer(read_only=True)
     tags = TagSerializer(
@@ -218,8 +203,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientSerializer(
         source='ingredient_links', many=True, read_only=True
     )
-    is_in_shopping_cart = serializers.SerializerMethodField()
-    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    is_favorited = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Recipe
@@ -230,28 +215,56 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_favorited'
         ]
 
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return bool(
-            user.is_authenticated
-            and obj.in_carts.filter(user=user).exists()
-        )
 
-    def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        return bool(
-            user.is_authenticated
-            and obj.favorited_by.filter(user=user).exists()
-        )
+class MinimalRecipeSerializer(serializers.ModelSerializer):
+    """
+    Краткое представление рецепта (id, name, image, cooking_time).
+    Словарь собирается вручную, без обхода полей DRF.
+    """
+    class Meta:
+        model = Recipe
+        fields = ('id', 'name', 'image', 'cooking_time')
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        image = instance.image.url if instance.image else None
+        if image and request is not None:
+            image = request.build_absolute_uri(image)
+        return {
+            'id': instance.id,
+            'name': instance.name,
+            'image': image,
+            'cooking_time': instance.cooking_time,
+        }
+
+
+class SubscriptionListSerializer(UserSerializer):
+    """Сериализатор списка подписок пользователя."""
+    recipes = MinimalRecipeSerializer(
+        source='limited_recipes', many=True, read_only=True
+    )
+    recipes_count = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
+
+
+class IngredientAmountSerializer(serializers.Serializer):
+    """Ингредиент и его количество во входных данных рецепта."""
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(
+        min_value=1,
+        error_messages={
+            'min_value': 'Количество должно быть больше нуля.'
+        }
+    )
 
 
 class RecipeCreateUpdateSerializer(
     serializers.ModelSerializer
 ):
     """Сериализатор для создания и редактирования рецепта."""
-    ingredients = serializers.ListField(
-        child=serializers.DictField(), write_only=True
-    )
+    ingredients = IngredientAmountSerializer(many=True, write_only=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True
     )
@@ -268,17 +281,32 @@ class RecipeCreateUpdateSerializer(
             'author'
         )
 
-    def validate(self, attrs):
-        ing = attrs.get('ingredients')
-        if not ing:
-            raise serializers.ValidationError(
-                'Ингредиенты обязательны.'
-            )
-        ids = [i.get('id') for i in ing]
+    def validate_ingredients(self, value):
+        # id уже приведены к int вложенным сериализатором.
+        ids = [item['id'] for item in value]
         if len(ids) != len(set(ids)):
             raise serializers.ValidationError(
                 'Ингредиенты должны быть уникальными.'
             )
+        # Все id проверяются одним запросом, а не ошибкой внешнего
+        # ключа при вставке.
+        existing = set(
+            Ingredient.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        missing = set(ids) - existing
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: {}.'.format(
+                    ', '.join(map(str, sorted(missing)))
+                )
+            )
+        return value
+
+    def validate(self, attrs):
+        if not attrs.get('ingredients'):
+            raise serializers.ValidationError(
+                'Ингредиенты обязательны.'
+            )
         tags = attrs.get('tags')
         if not tags:
             raise serializers.ValidationError(
@@ -304,6 +332,7 @@ class RecipeCreateUpdateSerializer(
         ])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ing_data = validated_data.pop('ingredients', None)
         tags = validated_data.pop('tags', None)
@@ -313,20 +342,44 @@ class RecipeCreateUpdateSerializer(
         if tags is not None:
             instance.tags.set(tags)
         if ing_data is not None:
-            instance.ingredient_links.all().delete()
-            RecipeIngredient.objects.bulk_create([
-                RecipeIngredient(
-                    recipe=instance,
+            self.update_ingredients(instance, ing_data)
+        return instance
+
+    def update_ingredients(self, recipe, ing_data):
+        """
+        Приводит ингредиенты рецепта к переданному списку, затрагивая
+        только добавленные, изменённые и удалённые строки.
+        """
+        existing = {
+            link.ingredient_id: link
+            for link in recipe.ingredient_links.all()
+        }
+        to_create = []
+        to_update = []
+        for item in ing_data:
+            link = existing.pop(item['id'], None)
+            if link is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe,
                     ingredient_id=item['id'],
                     amount=item['amount']
-                ) for item in ing_data
-            ])
-        return instance
+                ))
+            elif link.amount != item['amount']:
+                link.amount = item['amount']
+                to_update.append(link)
+        if existing:
+            RecipeIngredient.objects.filter(
+                pk__in=[link.pk for link in existing.values()]
+            ).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        RecipeIngredient.objects.bulk_create(to_create)
 
     def to_representation(self, instance):
-        from api.serializers import RecipeSerializer
+        recipe = get_recipe_queryset(
+            self.context['request'].user
+        ).get(pk=instance.pk)
         return RecipeSerializer(
-            instance, context=self.context
+            recipe, context=self.context
         ).data
 
 
@@ -344,6 +397,9 @@ class UserRecipeRelationSerializer(
     class Meta:
         abstract = True
         fields = ('id', 'user', 'recipe')
+        # Уникальность пары user-recipe обеспечивает ограничение в БД,
+        # повторное добавление обрабатывается в RelationHandlerMixin.
+        validators = []
 
 
 class FavoriteSerializer(
@@ -354,16 +410,9 @@ class FavoriteSerializer(
         UserRecipeRelationSerializer.Meta
     ):
         model = Favorite
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=['user', 'recipe']
-            )
-        ]
 
     def to_representation(self, instance):
-        from api.serializers import RecipeSerializer
-        return RecipeSerializer(
+        return MinimalRecipeSerializer(
             instance.recipe,
             context=self.context
         ).data
@@ -377,16 +426,9 @@ class ShoppingCartSerializer(
         UserRecipeRelationSerializer.Meta
     ):
         model = ShoppingCart
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=['user', 'recipe']
-            )
-        ]
 
     def to_representation(self, instance):
-        from api.serializers import RecipeSerializer
-        return RecipeSerializer(
+        return MinimalRecipeSerializer(
             instance.recipe,
             context=self.context
         ).data
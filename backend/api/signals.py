@@ -0,0 +1,13 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, Tag
+
+from .mixins import list_version_key
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_list_cache(sender, **kwargs):
+    cache.delete(list_version_key(sender))
@@ -1,69 +1,176 @@
+import os
+from collections import defaultdict
+from html import escape
 from io import BytesIO
 
-from xhtml2pdf import pisa
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import (
+    ListFlowable, ListItem, Paragraph, SimpleDocTemplate
+)
 
 
-def generate_shopping_cart_pdf(ingredients_by_recipe, combined_ingredients):
-    html = '''<!DOCTYPE html>
-    <html lang="ru">
-    <head>
-        <meta charset="UTF-8">
-        <title>Список покупок</title>
-        <style>
-            @page {
-                size: A4;
-                margin: 20mm;
-            }
-            @font-face {
-                font-family: "DejaVu";
-                src: url("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
-                    format("truetype");
-            }
-            body {
-                font-family: "DejaVu", sans-serif;
-                font-size: 14px;
-            }
-            h1 {
-                text-align: center;
-            }
-            ul {
-                list-style-type: none;
-                padding: 0;
-            }
-            li {
-                margin-bottom: 5px;
-            }
-        </style>
-    </head>
-    <body>
-        <h1>Список покупок</h1>
-    '''
-
-    for recipe, items in ingredients_by_recipe.items():
-        if hasattr(recipe, 'name'):
-            recipe_name = recipe.name
-        else:
-            recipe_name = str(recipe)
-        html += f'<h2>{recipe_name}</h2><ul>'
-        for ingredient in items:
-            html += f'<li>{ingredient}</li>'
-        html += '</ul>'
+# Шрифт с кириллицей регистрируется один раз при импорте модуля;
+# без него остаётся встроенный Helvetica.
+if os.path.exists(settings.PDF_FONT_PATH):
+    pdfmetrics.registerFont(TTFont('DejaVu', settings.PDF_FONT_PATH))
+    FONT_NAME = 'DejaVu'
+else:
+    FONT_NAME = 'Helvetica'
 
-    if combined_ingredients:
-        html += '<h2>Общие ингредиенты:</h2><ul>'
-        for name, data in sorted(combined_ingredients.items()):
-            unit = data.get('unit', '')
-            amount = data.get('amount', '')
-            html += f'<li>{name} ({unit}) - {amount}</li>'
-        html += '</ul>'
+# Стили документа не зависят от запроса и создаются один раз.
+_STYLES = getSampleStyleSheet()
+BODY_STYLE = ParagraphStyle(
+    'ShoppingCartBody', parent=_STYLES['Normal'],
+    fontName=FONT_NAME, fontSize=14, leading=18
+)
+TITLE_STYLE = ParagraphStyle(
+    'ShoppingCartTitle', parent=_STYLES['Title'], fontName=FONT_NAME
+)
+HEADING_STYLE = ParagraphStyle(
+    'ShoppingCartHeading', parent=_STYLES['Heading2'], fontName=FONT_NAME
+)
+PAGE_MARGIN = 20 * mm
+
+SMALL_CART_MAX_LINES = 20
+
+# Строка ингредиента: «название (единица) - количество».
+format_ingredient_line = '{} ({}) - {}'.format
+
+
+def bullet_list(lines, style):
+    return ListFlowable(
+        [ListItem(Paragraph(escape(line), style)) for line in lines],
+        bulletType='bullet'
+    )
 
-    html += '</body></html>'
 
+def split_text(text, font_size, width):
+    """
+    Разбивает текст на строки не шире width. В отличие от simpleSplit,
+    слово длиннее строки режется по символам, а не выходит за поле.
+    """
+    lines = []
+    for line in simpleSplit(text, FONT_NAME, font_size, width):
+        while stringWidth(line, FONT_NAME, font_size) > width:
+            cut = len(line) - 1
+            while (
+                cut > 1
+                and stringWidth(line[:cut], FONT_NAME, font_size) > width
+            ):
+                cut -= 1
+            lines.append(line[:cut])
+            line = line[cut:]
+        lines.append(line)
+    return lines
+
+
+def draw_shopping_cart(sections):
+    """
+    Рисует короткий список покупок прямо на холсте ReportLab,
+    без вёрстки platypus.
+    """
     pdf_buffer = BytesIO()
-    pisa_status = pisa.CreatePDF(html, dest=pdf_buffer)
+    canvas = Canvas(pdf_buffer, pagesize=A4)
+    canvas.setTitle('Список покупок')
+    page_width, page_height = A4
+    text_width = page_width - 2 * PAGE_MARGIN
+    lines = [('Список покупок', TITLE_STYLE)]
+    for heading, items in sections:
+        lines.append((heading, HEADING_STYLE))
+        lines.extend((f'\u2022 {item}', BODY_STYLE) for item in items)
+
+    y = page_height - PAGE_MARGIN
+    for text, style in lines:
+        for line in split_text(text, style.fontSize, text_width):
+            y -= style.leading
+            if y < PAGE_MARGIN:
+                canvas.showPage()
+                y = page_height - PAGE_MARGIN - style.leading
+            canvas.setFont(FONT_NAME, style.fontSize)
+            if style is TITLE_STYLE:
+                canvas.drawCentredString(page_width / 2, y, line)
+            else:
+                canvas.drawString(PAGE_MARGIN, y, line)
+    canvas.save()
     pdf_buffer.seek(0)
 
-    if pisa_status.err:
-        return None
+    return pdf_buffer
+
+
+def build_shopping_cart(sections):
+    """Вёрстка списка покупок через platypus с переносами и списками."""
+    story = [Paragraph('Список покупок', TITLE_STYLE)]
+    for heading, items in sections:
+        story.append(Paragraph(escape(heading), HEADING_STYLE))
+        story.append(bullet_list(items, BODY_STYLE))
+
+    pdf_buffer = BytesIO()
+    SimpleDocTemplate(
+        pdf_buffer, pagesize=A4,
+        leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN,
+        title='Список покупок'
+    ).build(story)
+    pdf_buffer.seek(0)
 
     return pdf_buffer
+
+
+def generate_shopping_cart_pdf(ingredients_by_recipe, combined_ingredients):
+    """
+    Собирает PDF списка покупок. ingredients_by_recipe — пары
+    (название рецепта, строки ингредиентов), combined_ingredients —
+    кортежи (название, единица, суммарное количество).
+    """
+    sections = list(ingredients_by_recipe)
+    if combined_ingredients:
+        sections.append(('Общие ингредиенты:', [
+            format_ingredient_line(name, unit, total_amount)
+            for name, unit, total_amount in combined_ingredients
+        ]))
+
+    # Короткий список помещается на страницу без вёрстки platypus.
+    if sum(len(items) for _, items in sections) <= SMALL_CART_MAX_LINES:
+        return draw_shopping_cart(sections)
+    return build_shopping_cart(sections)
+
+
+def render_shopping_cart(rows):
+    """
+    Собирает PDF списка покупок из строк корзины, упорядоченных по
+    названию ингредиента с учётом правил сортировки БД, и возвращает
+    байты. Из тех же строк собираются и списки по рецептам,
+    и суммарные количества ингредиентов.
+    """
+    recipes = {}
+    totals = defaultdict(int)
+    for recipe_id, created_at, recipe_name, name, unit, amount in rows:
+        recipes.setdefault(
+            recipe_id, (created_at, recipe_name, [])
+        )[2].append(format_ingredient_line(name, unit, amount))
+        totals[name, unit] += amount
+
+    # Рецепты идут от новых к старым, как в ленте.
+    ingredients_by_recipe = [
+        (recipe_name, items)
+        for _, (_, recipe_name, items) in sorted(
+            recipes.items(),
+            key=lambda entry: (-entry[1][0].timestamp(), entry[0])
+        )
+    ]
+    combined_ingredients = [
+        (name, unit, total_amount)
+        for (name, unit), total_amount in totals.items()
+    ]
+
+    return generate_shopping_cart_pdf(
+        ingredients_by_recipe, combined_ingredients
+    ).getvalue()
@@ -1,10 +1,16 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+import hashlib
+from io import BytesIO
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified
+)
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
@@ -20,13 +26,20 @@ from api.serializers import (
     SubscriptionListSerializer, TagSerializer, UserCreateSerializer,
     UserSerializer, AvatarSerializer
 )
+from .constants import SHOPPING_CART_PDF_CACHE_TIMEOUT
 from .filters import IngredientFilter, RecipeFilter
-from .mixins import RelationHandlerMixin
-from .utils import generate_shopping_cart_pdf
+from .mixins import (
+    USER_FIELDS, CachedListMixin, RelationHandlerMixin,
+    annotate_is_subscribed, get_recipe_queryset, get_subscription_queryset
+)
+from .paginations import RecipePagination
+from .utils import render_shopping_cart
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
-    queryset = Ingredient.objects.all().order_by('name')
+class IngredientViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Ingredient.objects.only(
+        'id', 'name', 'measurement_unit'
+    ).order_by('name')
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
@@ -34,28 +47,36 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientFilter
 
 
-class TagViewSet(viewsets.ModelViewSet):
-    queryset = Tag.objects.all()
+class TagViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Tag.objects.only('id', 'name', 'slug')
     serializer_class = TagSerializer
+    permission_classes = (AllowAny,)
     pagination_class = None
 
-    def get_permissions(self):
-        if self.request.method in ('GET',):
-            return (AllowAny(),)
-        return (IsAuthenticated(),)
-
 
 class RecipeViewSet(RelationHandlerMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all().order_by('-id')
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
 
     def get_permissions(self):
         if self.request.method in ('GET',):
             return (AllowAny(),)
         return (IsAuthenticated(),)
 
+    def get_queryset(self):
+        if self.action in ('favorite', 'shopping_cart', 'destroy'):
+            # Для связей и удаления нужен только сам рецепт,
+            # без аннотаций и prefetch.
+            return Recipe.objects.all()
+        queryset = get_recipe_queryset(self.request.user).order_by('-id')
+        if self.action in ('list', 'retrieve'):
+            # Метки времени не отдаются в RecipeSerializer.
+            queryset = queryset.defer('created_at', 'updated_at')
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
             return RecipeCreateUpdateSerializer
@@ -64,13 +85,29 @@ class RecipeViewSet(RelationHandlerMixin, viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    @action(detail=True, methods=('post', 'delete'))
+    def perform_destroy(self, instance):
+        image = instance.image
+        instance.delete()
+        if image:
+            # Файл удаляется из хранилища после фиксации транзакции,
+            # чтобы не держать запрос и не терять его при откате.
+            transaction.on_commit(lambda: image.storage.delete(image.name))
+
+    @action(
+        detail=True,
+        methods=('post', 'delete'),
+        parser_classes=(JSONParser,)
+    )
     def favorite(self, request, pk=None):
         return self.handle_relation(
             request, Favorite, 'избранное', FavoriteSerializer
         )
 
-    @action(detail=True, methods=('post', 'delete'))
+    @action(
+        detail=True,
+        methods=('post', 'delete'),
+        parser_classes=(JSONParser,)
+    )
     def shopping_cart(self, request, pk=None):
         return self.handle_relation(
             request, ShoppingCart, 'список покупок', ShoppingCartSerializer
@@ -83,8 +120,11 @@ class RecipeViewSet(RelationHandlerMixin, viewsets.ModelViewSet):
         url_path='get-link'
     )
     def get_link(self, request, pk=None):
-        recipe = self.get_object()
-        full_link = request.build_absolute_uri(f'/recipes/{recipe.id}/')
+        # Для ссылки достаточно id: проверяем существование без
+        # загрузки рецепта с аннотациями и prefetch. get_object_or_404
+        # из DRF отвечает 404 и на нечисловой pk.
+        get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        full_link = request.build_absolute_uri(f'/recipes/{pk}/')
         return Response({'short-link': full_link})
 
     @action(
@@ -94,51 +134,47 @@ class RecipeViewSet(RelationHandlerMixin, viewsets.ModelViewSet):
         url_path='download_shopping_cart'
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        recipes = Recipe.objects.filter(
-            in_carts__user=user
-        ).prefetch_related('ingredient_links__ingredient')
-
-        if not recipes.exists():
+        # Строки корзины выбираются один раз: по ним считается
+        # отпечаток и из них же собирается PDF. В отпечаток входит всё,
+        # что попадает в документ, поэтому правка количеств, названий
+        # или единиц меняет ключ. Одинаковые корзины разных
+        # пользователей дают один ключ и делят закэшированный PDF.
+        rows = list(
+            RecipeIngredient.objects.filter(
+                recipe__in_carts__user=request.user
+            ).values_list(
+                'recipe_id', 'recipe__created_at', 'recipe__name',
+                'ingredient__name', 'ingredient__measurement_unit', 'amount'
+            ).order_by(
+                'ingredient__name', 'ingredient__measurement_unit',
+                'recipe_id'
+            )
+        )
+        if not rows:
             return HttpResponse(
                 'Ваш список покупок пуст.', content_type='text/plain'
             )
-
-        ingredients_by_recipe = {
-            recipe.name: [
-                f"{link.ingredient.name} "
-                f"({link.ingredient.measurement_unit}) - {link.amount}"
-                for link in recipe.ingredient_links.all()
-            ] for recipe in recipes
-        }
-
-        aggregated = (
-            RecipeIngredient.objects.filter(recipe__in_carts__user=user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
-            .order_by('ingredient__name')
-        )
-
-        combined_ingredients = {
-            item['ingredient__name']: {
-                'unit': item['ingredient__measurement_unit'],
-                'amount': item['total_amount']
-            } for item in aggregated
-        }
-
-        pdf = generate_shopping_cart_pdf(
-            ingredients_by_recipe, combined_ingredients
-        )
-
-        return HttpResponse(
-            pdf,
-            content_type='application/pdf',
-            headers={
-                'Content-Disposition': (
-                    'attachment; filename="shopping_cart.pdf"'
-                )
-            }
+        fingerprint = hashlib.blake2b(
+            repr(rows).encode(), digest_size=16
+        ).hexdigest()
+        etag = f'"{fingerprint}"'
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponseNotModified(headers={'ETag': etag})
+
+        cache_key = f'shopping_cart_pdf:{fingerprint}'
+        pdf = cache.get(cache_key)
+        if pdf is None:
+            pdf = render_shopping_cart(rows)
+            cache.set(cache_key, pdf, SHOPPING_CART_PDF_CACHE_TIMEOUT)
+
+        response = FileResponse(
+            BytesIO(pdf),
+            as_attachment=True,
+            filename='shopping_cart.pdf',
+            content_type='application/pdf'
         )
+        response['ETag'] = etag
+        return response
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -150,6 +186,12 @@ class UserViewSet(viewsets.ModelViewSet):
             return (AllowAny(),)
         return super().get_permissions()
 
+    def get_queryset(self):
+        queryset = User.objects.all()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.only(*USER_FIELDS)
+        return annotate_is_subscribed(queryset, self.request.user)
+
     def get_serializer_class(self):
         if self.action == 'create':
             return UserCreateSerializer
@@ -187,22 +229,42 @@ class UserViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def subscribe(self, request, pk=None):
-        author = get_object_or_404(User, pk=pk)
-        data = {
-            'follower': request.user.id,
-            'following': author.id
-        }
-        serializer = SubscriptionListSerializer(
-            data=data, context={'request': request}
-        )
-        serializer.is_valid(raise_exception=True)
         if request.method == 'POST':
-            serializer.save()
+            if str(request.user.pk) == str(pk):
+                return Response(
+                    {'error': 'Нельзя подписаться на себя.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # recipes_limit проверяется до вставки подписки.
+            authors = get_subscription_queryset(User.objects.all(), request)
+            # Одна вставка: повторную подписку отсекает уникальность,
+            # несуществующего автора — внешний ключ.
+            try:
+                with transaction.atomic():
+                    _, created = Subscription.objects.get_or_create(
+                        follower=request.user, following_id=pk
+                    )
+            except IntegrityError:
+                raise Http404
+            if not created:
+                return Response(
+                    {'error': 'Вы уже подписаны на этого пользователя.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            serializer = SubscriptionListSerializer(
+                authors.get(pk=pk), context={'request': request}
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        Subscription.objects.filter(
-            follower=request.user, following=author
+        deleted_count, _ = Subscription.objects.filter(
+            follower=request.user, following_id=pk
         ).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        if deleted_count:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(User, pk=pk)
+        return Response(
+            {'error': 'Вы не подписаны на этого пользователя.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
     @action(
         detail=False,
@@ -211,9 +273,10 @@ class UserViewSet(viewsets.ModelViewSet):
         url_path='subscriptions'
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(
-            subscribers__follower=request.user
-        )
+        queryset = get_subscription_queryset(
+            User.objects.filter(subscribers__follower=request.user),
+            request
+        ).order_by('email')
         page = self.paginate_queryset(queryset)
         serializer = SubscriptionListSerializer(
             page, many=True, context={'request': request}
@@ -125,6 +125,11 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 CSV_URL = '/data/'
 CSV_FILES_DIR = os.path.join(BASE_DIR, 'data')
 
+# Шрифт с кириллицей для PDF списка покупок.
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 # === Пользовательская модель ===
 AUTH_USER_MODEL = 'users.User'
 
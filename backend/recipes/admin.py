@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 
 from .models import (
     Tag,
@@ -41,9 +42,16 @@ class RecipeAdmin(admin.ModelAdmin):
     autocomplete_fields = ('author', 'tags')
     ordering = ('-created_at',)
 
-    @admin.display(description='Добавлено в избранное')
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).annotate(_favorite_count=Count('favorited_by'))
+
+    @admin.display(
+        description='Добавлено в избранное', ordering='_favorite_count'
+    )
     def get_favorite_count(self, obj):
-        return obj.favorited_by.count()
+        return obj._favorite_count
 
 
 @admin.register(RecipeIngredient)
@@ -4,6 +4,3 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
-
-    def ready(self):
-        from .signals import create_default_tags  # noqa: F401
@@ -1,21 +1,35 @@
 from csv import reader
+from itertools import islice
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from recipes.models import Ingredient
 
+BATCH_SIZE = 1000
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 
 class Command(BaseCommand):
     help = 'Загрузка ингредиентов из CSV файла'
 
     def handle(self, *args, **options):
-        if Ingredient.objects.exists():
-            self.stdout.write(self.style.WARNING('Ингредиенты уже загружены'))
-            return
-
+        # Файл читается порциями; уже загруженные ингредиенты
+        # пропускаются по уникальному name, поэтому повторный запуск
+        # ничего не дублирует.
         with open('/app/data/ingredients.csv', encoding='utf-8') as f:
-            for row in reader(f):
-                name, measurement_unit = row
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=measurement_unit
-                )
+            with transaction.atomic():
+                for chunk in chunks(reader(f), BATCH_SIZE):
+                    Ingredient.objects.bulk_create(
+                        [
+                            Ingredient(
+                                name=name, measurement_unit=measurement_unit
+                            )
+                            for name, measurement_unit in chunk
+                        ],
+                        ignore_conflicts=True
+                    )
         self.stdout.write(self.style.SUCCESS('Ингредиенты успешно загружены'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-15 04:52
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='recipes_ing_name_164c6a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='ingredient_name_prefix_idx'),
+        ),
+        # Поиск по вхождению не используется: триграммный индекс и
+        # расширение pg_trgm больше ничего не обслуживают.
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='ingredient_name_trgm_idx',
+        ),
+        migrations.RunSQL(
+            'DROP EXTENSION IF EXISTS pg_trgm;',
+            reverse_sql='CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+DEFAULT_TAGS = [
+    {'name': 'Завтрак', 'slug': 'breakfast'},
+    {'name': 'Обед', 'slug': 'lunch'},
+    {'name': 'Ужин', 'slug': 'dinner'},
+    {'name': 'Десерт', 'slug': 'dessert'},
+]
+
+
+def create_default_tags(apps, schema_editor):
+    Tag = apps.get_model('recipes', 'Tag')
+    Tag.objects.bulk_create(
+        [Tag(**tag_data) for tag_data in DEFAULT_TAGS],
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_name_prefix_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_default_tags, migrations.RunPython.noop
+        ),
+    ]
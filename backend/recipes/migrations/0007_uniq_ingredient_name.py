@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-15 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_default_tags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(help_text='Уникальное имя ингредиента', max_length=255, verbose_name='Название'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name',), name='uniq_ingredient_name'),
+        ),
+    ]
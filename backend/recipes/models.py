@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import OpClass
 from django.core.validators import MinValueValidator
 
 from api.constants import (
@@ -29,7 +31,7 @@ class Ingredient(TimeStampedModel):
     Ингредиент для рецептов.
     """
     name = models.CharField(
-        'Название', max_length=INGREDIENT_NAME_MAX_LENGTH, unique=True,
+        'Название', max_length=INGREDIENT_NAME_MAX_LENGTH,
         help_text='Уникальное имя ингредиента'
     )
     measurement_unit = models.CharField(
@@ -41,7 +43,22 @@ class Ingredient(TimeStampedModel):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
-        indexes = [models.Index(fields=['name'])]
+        # Уникальность name задана явно: bulk_create(ignore_conflicts=True)
+        # в load_ingredients опирается на неё, а её B-tree индекс
+        # обслуживает и сортировку по name.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name'], name='uniq_ingredient_name'
+            ),
+        ]
+        indexes = [
+            # Префиксный индекс для name__istartswith, который PostgreSQL
+            # выполняет как UPPER(name) LIKE UPPER(...) при любой локали.
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='ingredient_name_prefix_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.measurement_unit})'
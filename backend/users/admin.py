@@ -1,13 +1,23 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils.html import format_html
 
 from .models import Subscription, User
 
 
+# Больше подписок на странице пользователя инлайны не выводят:
+# вместо них остаются ссылки на отфильтрованный список подписок.
+INLINE_SUBSCRIPTIONS_LIMIT = 50
+
+
 class FollowingInline(admin.TabularInline):
     model = Subscription
     fk_name = 'follower'
     extra = 0
+    autocomplete_fields = ('following',)
+    readonly_fields = ('created_at',)
     verbose_name = 'Подписка на пользователя'
     verbose_name_plural = 'Подписки'
 
@@ -16,6 +26,8 @@ class FollowersInline(admin.TabularInline):
     model = Subscription
     fk_name = 'following'
     extra = 0
+    autocomplete_fields = ('follower',)
+    readonly_fields = ('created_at',)
     verbose_name = 'Подписчик'
     verbose_name_plural = 'Подписчики'
 
@@ -29,7 +41,7 @@ class UserAdmin(BaseUserAdmin):
     list_filter = ('is_active', 'is_staff', 'is_superuser')
     search_fields = ('email', 'first_name', 'last_name')
     ordering = ('email',)
-    readonly_fields = ('last_login', 'date_joined')
+    readonly_fields = ('last_login', 'date_joined', 'subscription_links')
     inlines = [FollowingInline, FollowersInline]
 
     fieldsets = (
@@ -46,6 +58,7 @@ class UserAdmin(BaseUserAdmin):
             )
         }),
         ('Даты', {'fields': ('last_login', 'date_joined')}),
+        ('Подписки', {'fields': ('subscription_links',)}),
     )
 
     add_fieldsets = (
@@ -59,21 +72,58 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
-    @admin.display(description='Рецептов')
+    def get_inline_instances(self, request, obj=None):
+        # Срез вместо count(): достаточно узнать, есть ли строка
+        # за пределом, не подсчитывая все подписки пользователя.
+        if obj is not None and Subscription.objects.filter(
+            Q(follower=obj) | Q(following=obj)
+        )[INLINE_SUBSCRIPTIONS_LIMIT:].exists():
+            return []
+        return super().get_inline_instances(request, obj)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Автодополнение в формах подписок и рецептов счётчики не
+        # выводит, GROUP BY для него не нужен.
+        match = request.resolver_match
+        if match is not None and match.url_name == 'autocomplete':
+            return queryset
+        return queryset.annotate(
+            _recipes_count=Count('recipes', distinct=True),
+            _subscribers_count=Count('subscribers', distinct=True),
+        )
+
+    @admin.display(description='Список подписок')
+    def subscription_links(self, obj):
+        # Параметры follower/following, а не follower__id__exact:
+        # фильтр по связи с единственным вариантом не выводится
+        # и отбрасывает свой параметр вместе с фильтрацией.
+        url = reverse('admin:users_subscription_changelist')
+        return format_html(
+            '<a href="{}?follower={}">Подписки</a> / '
+            '<a href="{}?following={}">Подписчики</a>',
+            url, obj.pk, url, obj.pk
+        )
+
+    @admin.display(description='Рецептов', ordering='_recipes_count')
     def recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj._recipes_count
 
-    @admin.display(description='Подписчиков')
+    @admin.display(description='Подписчиков', ordering='_subscribers_count')
     def subscribers_count(self, obj):
-        return obj.subscribers.count()
+        return obj._subscribers_count
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('id', 'follower', 'following')
     search_fields = ('follower__email', 'following__email')
-    list_filter = ('follower', 'following')
+    list_filter = (
+        ('follower', admin.RelatedOnlyFieldListFilter),
+        ('following', admin.RelatedOnlyFieldListFilter),
+    )
     ordering = ('follower',)
+    autocomplete_fields = ('follower', 'following')
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-15 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.CheckConstraint(condition=models.Q(('follower', models.F('following')), _negated=True), name='subscription_not_self', violation_error_message='Нельзя подписаться на самого себя.'),
+        ),
+    ]
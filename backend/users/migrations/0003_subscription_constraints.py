@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-15 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_subscription_not_self'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('follower', 'following'), name='uniq_subscription'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subscription',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['following', 'follower'], name='sub_following_idx'),
+        ),
+    ]
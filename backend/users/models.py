@@ -1,4 +1,3 @@
-from django.core.exceptions import ValidationError
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
@@ -91,17 +90,27 @@ class Subscription(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('follower', 'following')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['follower', 'following'],
+                name='uniq_subscription',
+            ),
+            models.CheckConstraint(
+                condition=~models.Q(follower=models.F('following')),
+                name='subscription_not_self',
+                violation_error_message=_(
+                    'Нельзя подписаться на самого себя.'
+                ),
+            ),
+        ]
+        # Обратный индекс для выборок «кто подписан на автора».
+        indexes = [
+            models.Index(
+                fields=['following', 'follower'], name='sub_following_idx'
+            ),
+        ]
         verbose_name = _('Подписка')
         verbose_name_plural = _('Подписки')
 
     def __str__(self):
         return f'{self.follower} → {self.following}'
-
-    def clean(self):
-        if self.follower == self.following:
-            raise ValidationError(_('Нельзя подписаться на самого себя.'))
-
-    def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)